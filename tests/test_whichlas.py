@@ -0,0 +1,144 @@
+import os
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+np = pytest.importorskip("numpy")
+shapely = pytest.importorskip("shapely")
+whichlas = pytest.importorskip("whichlas")
+
+from shapely.strtree import STRtree  # noqa: E402
+
+
+def grid(n=50, skip=()):
+    cells = [(x, y) for x in range(n) for y in range(n) if (x, y) not in skip]
+    names = np.array([f"tile_{x}_{y}.las" for x, y in cells], dtype=object)
+    tiles = np.array([shapely.box(x, y, x + 1, y + 1) for x, y in cells], dtype=object)
+    return names, tiles
+
+
+def bbox_stats(query, names, tiles):
+    hits, geoms = whichlas.find_tiles(query, names, tiles, STRtree(tiles))
+    return whichlas.query_stats(query, geoms, hits, len(tiles), "test", True)
+
+
+def test_fully_tiled_bbox_is_not_partial():
+    names, tiles = grid()
+    rng = random.Random(0)
+    for _ in range(300):
+        x0, y0 = rng.uniform(0, 40), rng.uniform(0, 40)
+        query = shapely.box(x0, y0, x0 + rng.uniform(0.1, 9), y0 + rng.uniform(0.1, 9))
+        stats = bbox_stats(query, names, tiles)
+        assert not whichlas.is_partial_coverage(stats), query.bounds
+
+
+def test_missing_tile_is_partial():
+    names, tiles = grid(skip={(5, 5)})
+    stats = bbox_stats(shapely.box(4.5, 4.5, 6.5, 6.5), names, tiles)
+    assert whichlas.is_partial_coverage(stats)
+
+
+def test_columns():
+    assert whichlas.columns([]) == ""
+    assert whichlas.columns(["a", "b", "c"], cols=2, width=3) == "a  b  \nc  "
+
+
+def test_map_dpi_must_be_positive():
+    args = ["--minx", "0", "--miny", "0", "--maxx", "1", "--maxy", "1", "--shp", "x.shp"]
+    assert whichlas.parse_args(args + ["--map-dpi", "300"]).map_dpi == 300
+    for bad in ("0", "-72", "1.5"):
+        with pytest.raises(SystemExit):
+            whichlas.parse_args(args + ["--map-dpi", bad])
+
+
+def test_zero_area_csv_query_has_no_area_stats():
+    names, tiles = grid(5)
+    query = shapely.LineString([(0.5, 0.5), (3.5, 3.5)])
+    hits, geoms = whichlas.find_tiles(query, names, tiles, STRtree(tiles))
+    stats = whichlas.query_stats(query, geoms, hits, len(tiles), "test", False)
+    assert stats["tiles_used"] == len(hits) > 0
+    assert "coverage_percent" not in stats
+
+
+SAMPLE = Path(__file__).resolve().parent.parent / "sample_data" / "NYC2021_LAS_Index"
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    """Copy of the sample index with the packed cache kept under tmp_path."""
+    pytest.importorskip("pyogrio")
+    import shutil
+
+    for ext in (".shp", ".shx", ".dbf", ".prj"):
+        shutil.copy(SAMPLE.with_suffix(ext), tmp_path / f"index{ext}")
+    monkeypatch.setattr(whichlas, "INDEX_CACHE_DIR", tmp_path / "cache")
+    shp = tmp_path / "index.shp"
+    _, pj, _, fld = whichlas.open_index(shp, use_cache=False)
+    return shp, fld, pj
+
+
+def hits_in(bbox, names, tiles):
+    return whichlas.find_tiles(shapely.box(*bbox), names, tiles, STRtree(tiles))[0]
+
+
+def middle_bbox(shp, fld):
+    _, tiles = whichlas.read_index(shp, fld)
+    minx, miny, maxx, maxy = shapely.total_bounds(tiles)
+    dx, dy = (maxx - minx) / 10, (maxy - miny) / 10
+    cx, cy = (minx + maxx) / 2, (miny + maxy) / 2
+    return cx - dx, cy - dy, cx + dx, cy + dy
+
+
+def test_cache_matches_shapefile(index):
+    shp, fld, pj = index
+    bbox = middle_bbox(shp, fld)
+    expected = hits_in(bbox, *whichlas.read_index(shp, fld))
+
+    assert whichlas.load_index_cache(shp, fld) is None
+    miss = hits_in(bbox, *whichlas.load_tiles(shp, fld, pj, bbox=bbox))
+    assert whichlas.load_index_cache(shp, fld) is not None
+    hit = hits_in(bbox, *whichlas.load_tiles(shp, fld, pj, bbox=bbox))
+    assert expected and miss == hit == expected
+
+    total, _, _, cached_fld = whichlas.open_index(shp)
+    assert (total, cached_fld) == (len(whichlas.read_index(shp, fld)[0]), fld)
+
+
+def test_cache_is_stale_after_index_changes(index):
+    shp, fld, pj = index
+    whichlas.load_tiles(shp, fld, pj)
+    assert whichlas.load_index_cache(shp, fld) is not None
+
+    dbf = shp.with_suffix(".dbf")
+    st = dbf.stat()
+    os.utime(dbf, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert whichlas.load_index_cache(shp, fld) is None
+    assert whichlas.load_index_meta(shp) is None
+
+
+def test_corrupt_cache_is_rebuilt(index):
+    shp, fld, pj = index
+    names, _ = whichlas.load_tiles(shp, fld, pj)
+    path = whichlas.cache_path(shp)
+    path.write_bytes(path.read_bytes()[:1000])
+
+    assert whichlas.load_index_cache(shp, fld) is None
+    rebuilt, _ = whichlas.load_tiles(shp, fld, pj)
+    assert set(rebuilt) == set(names)
+    assert whichlas.load_index_cache(shp, fld) is not None
+
+
+def test_unwritable_cache_dir_falls_back_to_shapefile(index, monkeypatch, tmp_path):
+    shp, fld, pj = index
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    monkeypatch.setattr(whichlas, "INDEX_CACHE_DIR", blocker / "cache")
+
+    bbox = middle_bbox(shp, fld)
+    expected = hits_in(bbox, *whichlas.read_index(shp, fld))
+    assert expected
+    assert hits_in(bbox, *whichlas.load_tiles(shp, fld, pj, bbox=bbox)) == expected
@@ -8,41 +8,89 @@ Find which LAS tiles cover either:
 
 Reads a .shp index of tiles, reprojects from EPSG:4326,
 reports coverage stats, lists needed tiles, and always
-generates a coverage_map.tiff with a contextual basemap.
+generates a coverage map (PNG by default) with a contextual basemap.
 In CSV mode, takes the convex hull of your points+path to
 fill any interior gaps, and plots the points as dots on the map.
 """
 
 import argparse
+import hashlib
+import importlib.util
+import os
+import shlex
+import shutil
+import subprocess
 import sys
+import tempfile
 import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Tuple, Optional, Union
 
-import fiona
-import pandas as pd
-from shapely.geometry import box, shape, Point, LineString, Polygon
-from shapely.ops import transform, unary_union
+# never download PROJ grids mid-query; an explicit setting still wins
+os.environ.setdefault("PROJ_NETWORK", "OFF")
+
+import numpy as np
+import shapely
+from shapely.geometry import box, Polygon
+from shapely.ops import transform
+from shapely.strtree import STRtree
 from pyproj import Transformer, CRS
 from tabulate import tabulate
 from colorama import init, Fore, Style
 
-# Optional imports for mapping (graceful fallback)
-try:
-    import geopandas as gpd
-    import matplotlib.pyplot as plt
-    import contextily as ctx
-    HAS_MAPPING = True
-except ImportError:
-    HAS_MAPPING = False
+# Optional mapping stack (graceful fallback). Only probe for it here; the
+# imports themselves are slow and happen when a map is actually drawn.
+HAS_MAPPING = all(
+    importlib.util.find_spec(m) is not None
+    for m in ("matplotlib", "contextily")
+)
+# Optional rasterio for --raster-coverage (same lazy approach)
+HAS_RASTERIO = importlib.util.find_spec("rasterio") is not None
 
 # unit conversions
 FT2_TO_M2 = 0.09290304
 FT2_TO_MI2 = 1 / (5280 ** 2)
 
+# below this many candidates a single vectorized call beats thread startup
+PARALLEL_MIN_TILES = 20_000
+
+# grid size (per side) for --raster-coverage
+RASTER_SIZE = 1024
+
+# a clipped union's area can come out a few ulps short of the query's even
+# when tiles cover it completely; shortfalls below this (in percent, i.e.
+# 1e-9 of the query area) count as full coverage
+COVERAGE_TOLERANCE = 1e-7
+
+# basemap tiles are kept here across runs
+TILE_CACHE_DIR = Path("~/.cache/whichlas-tiles").expanduser()
+
+# packed tile index caches live here, one per shapefile
+INDEX_CACHE_DIR = Path("~/.cache/whichlas/index").expanduser()
+
+
+class QueryArgumentParser(argparse.ArgumentParser):
+    """Parser for --serve query lines: raises ValueError instead of exiting."""
+
+    def error(self, message):
+        raise ValueError(message)
+
 
-def parse_args():
-    p = argparse.ArgumentParser(
+def positive_int(value: str) -> int:
+    """argparse type for integers greater than zero."""
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if n <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {n}")
+    return n
+
+
+def build_parser(parser_class=argparse.ArgumentParser, **kwargs):
+    p = parser_class(
         description="Which LAS tiles cover a bbox or CSV of points+path?",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
@@ -55,7 +103,11 @@ Examples:
 
   # With custom output formats
   %(prog)s --shp tiles.shp --csv points.csv --format json --out tiles.json
-        """
+
+  # Keep the index loaded and answer one query per stdin line
+  echo "--minx -74.1 --miny 40.7 --maxx -73.9 --maxy 40.8" | %(prog)s --shp tiles.shp --serve
+        """,
+        **kwargs
     )
     grp = p.add_mutually_exclusive_group(required=True)
     grp.add_argument(
@@ -64,6 +116,11 @@ Examples:
     grp.add_argument(
         "--minx", type=float, help="Lon min (for bbox search once you specify all four)"
     )
+    grp.add_argument(
+        "--serve",
+        action="store_true",
+        help="Keep the index loaded and answer queries read from stdin, one per line"
+    )
     p.add_argument("--miny", type=float, help="Lat min")
     p.add_argument("--maxx", type=float, help="Lon max")
     p.add_argument("--maxy", type=float, help="Lat max")
@@ -90,19 +147,49 @@ Examples:
         action="store_true", 
         help="Skip map generation"
     )
+    p.add_argument(
+        "--map-format",
+        choices=["png", "pdf", "svg", "tiff"],
+        default="png",
+        help="Coverage map format; pdf/svg keep tile outlines as vectors (default: png)"
+    )
+    p.add_argument(
+        "--map-dpi",
+        type=positive_int,
+        default=150,
+        help="Coverage map resolution (default: 150)"
+    )
+    p.add_argument(
+        "--raster-coverage",
+        action="store_true",
+        help=f"Estimate bbox coverage on a {RASTER_SIZE}x{RASTER_SIZE} grid "
+             "instead of an exact polygon union (needs rasterio)"
+    )
+    p.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't read or write the packed index cache in ~/.cache/whichlas"
+    )
     p.add_argument(
         "--preview", 
         action="store_true", 
         help="Show query geometry info without processing tiles"
     )
-    return p.parse_args()
+    return p
+
+
+def parse_args(argv=None):
+    return build_parser().parse_args(argv)
 
 
 def columns(lst, cols=4, width=16):
-    lines = []
-    for i in range(0, len(lst), cols):
-        lines.append("".join(f"{s:<{width}}" for s in lst[i : i + cols]))
-    return "\n".join(lines)
+    if not lst:
+        return ""
+    # pad every cell in one C-level pass, then lay the cells out as rows;
+    # the short last row is filled with empty cells that join to nothing
+    cells = np.char.ljust(np.asarray(lst, dtype=str), width)
+    cells = np.append(cells, [""] * (-len(cells) % cols)).reshape(-1, cols)
+    return "\n".join("".join(row) for row in cells.tolist())
 
 
 def validate_coordinates(x, y, crs="EPSG:4326"):
@@ -116,9 +203,326 @@ def validate_coordinates(x, y, crs="EPSG:4326"):
     return True
 
 
+def ensure_spatial_index(shp: Path) -> bool:
+    """Build a .qix quadtree for the shapefile if it has no spatial index yet.
+
+    OGR uses the .qix (or ESRI .sbn) to answer bbox filters without reading
+    every record. Needs `ogrinfo` on PATH and a writable index directory;
+    returns False if no index could be found or built.
+    """
+    if shp.with_suffix(".qix").exists() or shp.with_suffix(".sbn").exists():
+        return True
+    ogrinfo = shutil.which("ogrinfo")
+    if not ogrinfo:
+        return False
+    try:
+        subprocess.run(
+            [ogrinfo, "-q", str(shp), "-sql", f'CREATE SPATIAL INDEX ON "{shp.stem}"'],
+            check=True,
+            capture_output=True,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return shp.with_suffix(".qix").exists()
+
+
+def cache_path(shp: Path) -> Path:
+    """Location of the packed index cache for a shapefile.
+
+    Kept in the user's cache directory, keyed by the resolved .shp path, so
+    indexes on read-only shares are cached too.
+    """
+    key = hashlib.sha1(str(shp.resolve()).encode()).hexdigest()[:16]
+    return INDEX_CACHE_DIR / f"{shp.stem}-{key}.npz"
+
+
+def _cache_writable() -> bool:
+    """True if index caches can be written to INDEX_CACHE_DIR."""
+    try:
+        INDEX_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return False
+    return os.access(INDEX_CACHE_DIR, os.W_OK)
+
+
+def _index_stamp(shp: Path) -> np.ndarray:
+    """mtime/size of the .shp and .dbf, used to detect a stale cache."""
+    stamp = []
+    for part in (shp, shp.with_suffix(".dbf")):
+        st = part.stat() if part.exists() else None
+        stamp += [st.st_mtime_ns, st.st_size] if st else [0, 0]
+    return np.array(stamp, dtype=np.int64)
+
+
+def save_index_cache(shp: Path, fld: str, names, tiles, crs) -> bool:
+    """Pack filenames, envelopes and WKB of every tile into a cache file.
+
+    Later runs prefilter on the stored envelopes and decode only the WKB of
+    tiles that can intersect the query. The CRS and field name are stored
+    too, so a cache hit never has to open the shapefile. Returns False if
+    the cache can't be written (e.g. read-only home directory).
+    """
+    wkb = shapely.to_wkb(tiles)
+    offsets = np.zeros(len(wkb) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in wkb])
+    path = cache_path(shp)
+    tmp = None
+    try:
+        # unique temp file so concurrent runs never interleave their writes
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=path.name, suffix=".tmp", delete=False
+        ) as f:
+            tmp = Path(f.name)
+            np.savez(
+                f,
+                stamp=_index_stamp(shp),
+                field=np.array(fld),
+                crs=np.array(CRS(crs).to_wkt()),
+                names=np.asarray(names, dtype=str),
+                bounds=shapely.bounds(tiles),
+                offsets=offsets,
+                wkb=np.frombuffer(b"".join(wkb), dtype=np.uint8),
+            )
+        tmp.replace(path)
+    except OSError:
+        if tmp is not None:
+            tmp.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def load_index_cache(shp: Path, fld: str) -> Optional[dict]:
+    """Load the packed index cache, or None if it's missing, stale or unreadable."""
+    path = cache_path(shp)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as z:
+            if str(z["field"]) != fld or not np.array_equal(z["stamp"], _index_stamp(shp)):
+                return None
+            if "crs" not in z.files:  # written before metadata was cached
+                return None
+            cache = {k: z[k] for k in ("names", "bounds", "offsets")}
+            cache["wkb"] = z["wkb"].tobytes()
+            return cache
+    except Exception:
+        # truncated or corrupt cache (e.g. BadZipFile): rebuild it
+        return None
+
+
+def load_index_meta(shp: Path) -> Optional[Tuple[int, str, str]]:
+    """(tile count, CRS WKT, filename field) from a fresh cache, else None."""
+    path = cache_path(shp)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as z:
+            if not np.array_equal(z["stamp"], _index_stamp(shp)):
+                return None
+            return len(z["names"]), str(z["crs"]), str(z["field"])
+    except Exception:
+        return None
+
+
+def read_index(shp: Path, fld: str, bbox=None):
+    """Read filenames and geometries from the shapefile, optionally bbox-filtered.
+
+    OGR applies the bbox filter (backed by the .qix when present) and hands
+    back WKB for the survivors, decoded in one vectorized call.
+    """
+    import pyogrio  # pulls in pandas; only needed when the cache can't serve
+
+    if bbox is not None:
+        ensure_spatial_index(shp)
+    _, _, wkb, (names,) = pyogrio.raw.read(str(shp), columns=[fld], bbox=bbox)
+    return names, shapely.from_wkb(wkb)
+
+
+def _overlapping(bounds: np.ndarray, bbox) -> np.ndarray:
+    """Indices of the (minx, miny, maxx, maxy) rows that overlap bbox."""
+    minx, miny, maxx, maxy = bbox
+    return np.flatnonzero(
+        (bounds[:, 0] <= maxx) & (bounds[:, 2] >= minx)
+        & (bounds[:, 1] <= maxy) & (bounds[:, 3] >= miny)
+    )
+
+
+def load_tiles(shp: Path, fld: str, crs, bbox=None, use_cache=True):
+    """Return (filenames, geometries) of the tiles whose envelopes overlap bbox.
+
+    With bbox=None every tile is returned. The packed cache is built from a
+    full read on first use and reused while the shapefile is unchanged. If
+    no cache can be written, the bbox-filtered OGR read is used instead.
+    """
+    if not use_cache:
+        return read_index(shp, fld, bbox)
+
+    cache = load_index_cache(shp, fld)
+    if cache is None:
+        if not _cache_writable():
+            return read_index(shp, fld, bbox)
+        names, tiles = read_index(shp, fld)
+        save_index_cache(shp, fld, names, tiles, crs)
+        if bbox is None:
+            return names, tiles
+        idx = _overlapping(shapely.bounds(tiles), bbox)
+        return names[idx], tiles[idx]
+
+    if bbox is None:
+        idx = np.arange(len(cache["names"]))
+    else:
+        idx = _overlapping(cache["bounds"], bbox)
+    # slice the candidates' WKB straight out of the packed buffer and decode
+    # them in a single C call; nothing outside the bbox is ever parsed
+    off, buf = cache["offsets"].tolist(), cache["wkb"]
+    wkb = np.array([buf[off[i] : off[i + 1]] for i in idx], dtype=object)
+    return cache["names"][idx], shapely.from_wkb(wkb)
+
+
+@lru_cache(maxsize=4)
+def get_transformer(src, dst) -> Transformer:
+    """always_xy Transformer between two CRS, built once per pair."""
+    return Transformer.from_crs(src, dst, always_xy=True)
+
+
+def open_index(shp: Path, use_cache=True):
+    """Read index metadata: (tile count, CRS, CRS label, filename field or None).
+
+    Served from the packed cache when it is fresh, so pyogrio (and the
+    pandas it imports) is only loaded when the shapefile must be read.
+    """
+    meta = load_index_meta(shp) if use_cache else None
+    if meta is not None:
+        features, crs, fld = meta
+    else:
+        import pyogrio
+
+        info = pyogrio.read_info(str(shp))
+        features, crs = info["features"], info["crs"]
+        fld = next((f for f in info["fields"] if f.lower().startswith("file")), None)
+    pj = CRS(crs)
+    auth = pj.to_authority()
+    crs_label = f"{auth[0]}:{auth[1]} — {pj.name}" if auth else pj.name
+    return features, pj, crs_label, fld
+
+
+def intersects_mask(query_geom, geoms) -> np.ndarray:
+    """Vectorized query_geom.intersects(geoms), split across threads when large.
+
+    Shapely releases the GIL inside GEOS, so chunks really run in parallel.
+    Each worker prepares its own copy of the query, since a prepared
+    geometry builds its index lazily and isn't safe to share.
+    """
+    workers = min(os.cpu_count() or 1, len(geoms) // PARALLEL_MIN_TILES)
+    if workers < 2:
+        shapely.prepare(query_geom)
+        return shapely.intersects(query_geom, geoms)
+
+    query_wkb = shapely.to_wkb(query_geom)
+
+    def run(chunk):
+        q = shapely.from_wkb(query_wkb)
+        shapely.prepare(q)
+        return shapely.intersects(q, chunk)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(run, np.array_split(geoms, workers))))
+
+
+def find_tiles(query_geom, names, tiles, tree):
+    """Filenames and geometries of the tiles that intersect query_geom.
+
+    The R-tree narrows the tiles to those whose envelopes overlap the query;
+    only those get the exact intersects test.
+    """
+    cand = np.sort(tree.query(query_geom))
+    idx = cand[intersects_mask(query_geom, tiles[cand])]
+    return set(names[idx].tolist()), tiles[idx]
+
+
+def raster_coverage(query_geom, geoms, size=RASTER_SIZE) -> float:
+    """Approximate percent of query_geom covered by geoms.
+
+    Burns the query and the tiles into size x size masks over the query's
+    bounds and compares pixel counts, which avoids any polygon union.
+    """
+    from rasterio.features import rasterize
+    from rasterio.transform import from_bounds
+
+    tf = from_bounds(*query_geom.bounds, size, size)
+    query_mask = rasterize([query_geom], out_shape=(size, size), transform=tf)
+    tile_mask = rasterize(list(geoms), out_shape=(size, size), transform=tf)
+    inside = np.count_nonzero(query_mask)
+    return np.count_nonzero(tile_mask & query_mask) / inside * 100 if inside else 0.0
+
+
+def query_stats(query_geom, geoms, hits, total_tiles, crs_label, is_bbox,
+                raster=False) -> dict:
+    """Summary statistics for a query, keyed like the JSON output (unrounded).
+
+    With raster=True coverage is estimated with raster_coverage().
+    """
+    used = len(hits)
+    stats = {
+        "total_tiles_in_index": total_tiles,
+        "tiles_used": used,
+        "percent_index_used": used / total_tiles * 100,
+        "crs": crs_label,
+        "query_type": "bbox" if is_bbox else "csv_points"
+    }
+
+    # area metrics (feet²) are only reported for bbox queries; a CSV query
+    # just needs the tile list, so skip the union entirely there
+    if not is_bbox:
+        return stats
+
+    area_ft2 = query_geom.area
+
+    # index tiles don't overlap, so their footprint is just the summed area;
+    # coverage only needs the part of each tile inside the query, which makes
+    # the union far cheaper than dissolving the full tiles
+    area2_ft2 = float(shapely.area(geoms).sum())
+    if raster and len(geoms):
+        cov = raster_coverage(query_geom, geoms)
+    else:
+        # tiles strictly inside the query need no clipping; the prepared
+        # contains_properly test finds them far faster than an overlay
+        shapely.prepare(query_geom)
+        clipped = geoms.copy()
+        edge = ~shapely.contains_properly(query_geom, geoms)
+        clipped[edge] = shapely.intersection(geoms[edge], query_geom)
+        covered_ft2 = shapely.union_all(clipped).area
+        cov = covered_ft2 / area_ft2 * 100
+
+    stats.update({
+        "bbox_km2": area_ft2 * FT2_TO_M2 / 1e6,
+        "bbox_mi2": area_ft2 * FT2_TO_MI2,
+        "tiles_km2": area2_ft2 * FT2_TO_M2 / 1e6,
+        "tiles_mi2": area2_ft2 * FT2_TO_MI2,
+        "coverage_percent": cov,
+        "overrun_percent": area2_ft2 / area_ft2 * 100 - 100
+    })
+    return stats
+
+
+def is_partial_coverage(stats: dict) -> bool:
+    """True if a bbox query's tiles leave part of the box uncovered."""
+    return stats.get("coverage_percent", 100) < 100 - COVERAGE_TOLERANCE
+
+
+def round_stats(stats: dict) -> dict:
+    """Round query_stats() output for writing: percentages to 0.1, areas to 0.01."""
+    return {
+        k: round(v, 1 if "percent" in k else 2) if isinstance(v, float) else v
+        for k, v in stats.items()
+    }
+
+
 def build_query_geometry(args):
     """Build the query geometry from either CSV or bbox arguments."""
     if args.csv:
+        import pandas as pd
+
         csv_path = Path(args.csv).expanduser().resolve()
         if not csv_path.exists():
             raise ValueError(f"CSV file not found: {csv_path}")
@@ -144,8 +548,16 @@ def build_query_geometry(args):
                 f"Please specify with --csvx and --csvy. Available: {', '.join(df.columns)}"
             )
             
-        # Validate coordinates
-        for idx, (x, y) in enumerate(zip(df[xcol], df[ycol])):
+        xs = pd.to_numeric(df[xcol], errors="coerce").to_numpy(dtype=float)
+        ys = pd.to_numeric(df[ycol], errors="coerce").to_numpy(dtype=float)
+
+        # Validate coordinates: only rows failing a vectorized sanity check
+        # (missing, non-numeric, out of range) need the per-row checks
+        suspect = ~(np.isfinite(xs) & np.isfinite(ys))
+        if args.input_crs.upper() == "EPSG:4326":
+            suspect |= (np.abs(xs) > 180) | (np.abs(ys) > 90)
+        for idx in np.flatnonzero(suspect):
+            x, y = df[xcol].iloc[idx], df[ycol].iloc[idx]
             if pd.isna(x) or pd.isna(y):
                 raise ValueError(f"Missing coordinates at row {idx + 1}")
             try:
@@ -153,17 +565,16 @@ def build_query_geometry(args):
             except (ValueError, TypeError) as e:
                 raise ValueError(f"Invalid coordinates at row {idx + 1}: {e}")
                 
-        pts = [Point(x, y) for x, y in zip(df[xcol], df[ycol])]
+        pts = shapely.points(xs, ys)
         
         if len(pts) < 2:
             # Single point - just buffer it slightly
             geom = pts[0].buffer(0.001)  # ~100m buffer
         else:
-            # Multiple points - create path and convex hull
-            path = LineString([(p.x, p.y) for p in pts])
-            union = unary_union(pts + [path])
-            # take convex hull to fill any interior gaps
-            geom = union.convex_hull
+            # Multiple points - convex hull to fill any interior gaps. The
+            # path between the points lies inside the hull of the points
+            # alone, so it never needs to be built or unioned in
+            geom = shapely.multipoints(np.column_stack([xs, ys])).convex_hull
             
         return geom, False, pts
     else:
@@ -191,7 +602,7 @@ def write_output(tiles: List[str], filepath: str, format_type: str, **metadata):
     """Write tiles list in the specified format."""
     if format_type == "txt":
         with open(filepath, "w") as f:
-            f.write("\n".join(tiles))
+            f.writelines(name + "\n" for name in tiles)
     elif format_type == "json":
         data = {
             "tiles": tiles,
@@ -201,53 +612,93 @@ def write_output(tiles: List[str], filepath: str, format_type: str, **metadata):
         with open(filepath, "w") as f:
             json.dump(data, f, indent=2)
     elif format_type == "csv":
+        import pandas as pd
+
         df = pd.DataFrame({"filename": tiles})
         df.to_csv(filepath, index=False)
 
 
-def generate_coverage_map(gdf_all, gdf_sel, gdf_query, gdf_pts, output_path="coverage_map.tiff"):
-    """Generate and save the coverage map."""
+def _line_coords(lines) -> List[np.ndarray]:
+    """Split an array of linear geometries into per-line (n, 2) coordinate arrays."""
+    coords, index = shapely.get_coordinates(lines, return_index=True)
+    return np.split(coords, np.flatnonzero(np.diff(index)) + 1)
+
+
+def generate_coverage_map(tiles, selected, query_geom, points, src_crs, input_crs,
+                          output_path="coverage_map.png", dpi=150):
+    """Generate and save the coverage map.
+
+    Geometries are reprojected to Web Mercator as coordinate arrays and drawn
+    as matplotlib collections, without going through GeoDataFrames.
+    """
     if not HAS_MAPPING:
         print(Fore.YELLOW + "Warning: Mapping libraries not available. Install with:")
-        print("  pip install geopandas matplotlib contextily")
+        print("  pip install matplotlib contextily")
         return False
         
     try:
-        # Make copies to avoid modifying original dataframes
-        gdf_all_map = gdf_all.copy()
-        gdf_sel_map = gdf_sel.copy()
-        gdf_query_map = gdf_query.copy()
-        
-        # reproject to Web Mercator for mapping
-        gdf_all_map = gdf_all_map.to_crs(epsg=3857)
-        gdf_sel_map = gdf_sel_map.to_crs(epsg=3857)
-        gdf_query_map = gdf_query_map.to_crs(epsg=3857)
-        
-        if not gdf_pts.empty:
-            gdf_pts_map = gdf_pts.to_crs(epsg=3857)
-        else:
-            gdf_pts_map = gdf_pts
+        import matplotlib
+        matplotlib.use("Agg")  # file output only; skip GUI backend probing
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import LineCollection, PolyCollection
+        import contextily as ctx
+
+        # reproject to Web Mercator for mapping; tiles and query share the
+        # index CRS, so one transformer covers both
+        to_web = get_transformer(src_crs, "EPSG:3857")
+
+        def web(geoms):
+            return shapely.transform(
+                geoms, lambda c: np.column_stack(to_web.transform(c[:, 0], c[:, 1]))
+            )
+
+        all_lines = shapely.get_parts(shapely.boundary(web(tiles)))
+        sel_rings = shapely.get_exterior_ring(shapely.get_parts(web(selected)))
+        # a collinear CSV hull is already a line; its boundary would be
+        # just the endpoints, so only take boundaries of areal queries
+        query_web = web(query_geom)
+        if shapely.get_dimensions(query_web) == 2:
+            query_web = shapely.boundary(query_web)
+        query_lines = shapely.get_parts(query_web)
 
         fig, ax = plt.subplots(1, 1, figsize=(12, 12))
         
         # Plot layers
-        gdf_all_map.boundary.plot(ax=ax, color="lightgray", linewidth=0.5, alpha=0.7)
-        gdf_sel_map.plot(ax=ax, color="blue", alpha=0.6, edgecolor="navy", linewidth=1)
-        gdf_query_map.boundary.plot(ax=ax, color="red", linewidth=2.5)
+        ax.add_collection(LineCollection(
+            _line_coords(all_lines), colors="lightgray", linewidths=0.5, alpha=0.7
+        ))
+        ax.add_collection(PolyCollection(
+            _line_coords(sel_rings), facecolors="blue", edgecolors="navy",
+            linewidths=1, alpha=0.6
+        ))
+        ax.add_collection(LineCollection(
+            _line_coords(query_lines), colors="red", linewidths=2.5
+        ))
         
-        if not gdf_pts_map.empty:
-            gdf_pts_map.plot(ax=ax, color="yellow", marker="o", markersize=60, 
-                           edgecolor="black", linewidth=1.5)
+        if len(points):
+            pts_web = get_transformer(input_crs, "EPSG:3857")
+            xy = shapely.get_coordinates(points)
+            px, py = pts_web.transform(xy[:, 0], xy[:, 1])
+            ax.scatter(px, py, color="yellow", marker="o", s=60,
+                       edgecolors="black", linewidths=1.5, zorder=3)
+
+        ax.set_aspect("equal")
+        ax.autoscale_view()
 
-        # Add basemap
+        # Add basemap, reusing tiles downloaded by earlier runs when possible
+        try:
+            TILE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            ctx.set_cache_dir(str(TILE_CACHE_DIR))
+        except OSError:
+            pass
         ctx.add_basemap(ax, source=ctx.providers.OpenStreetMap.Mapnik, alpha=0.8)
         
         # Styling
         ax.set_title("LAS Tile Coverage Map", fontsize=16, fontweight='bold', pad=20)
         ax.set_axis_off()
 
-        # Save with high quality
-        fig.savefig(str(output_path), dpi=300, bbox_inches="tight", 
+        # Save; the format follows the file extension
+        fig.savefig(str(output_path), dpi=dpi, bbox_inches="tight", 
                    facecolor='white', edgecolor='none')
         print(Fore.GREEN + f"Coverage map saved: {output_path}")
         plt.close(fig)
@@ -258,6 +709,54 @@ def generate_coverage_map(gdf_all, gdf_sel, gdf_query, gdf_pts, output_path="cov
         return False
 
 
+def serve(args, shp: Path):
+    """Answer queries from stdin against an index kept loaded in memory.
+
+    Each line holds the query options of a normal invocation (e.g.
+    "--minx ... --maxy ..." or "--csv points.csv"). Each answer is one JSON
+    line on stdout with the same content as --format json, or {"error": ...}.
+    Query options given alongside --serve (--input-crs, --buffer, ...) act
+    as defaults for every line. The PROJ transformers, index and R-tree stay hot between queries.
+    """
+    total_tiles, pj, crs_label, fld = open_index(shp, use_cache=not args.no_cache)
+    if not fld:
+        print(json.dumps({"error": "No file-name field in schema"}), flush=True)
+        sys.exit(1)
+    names, tiles = load_tiles(shp, fld, pj, use_cache=not args.no_cache)
+    tree = STRtree(tiles)
+
+    # no -h/--help and no printing: every problem becomes a JSON error line
+    parser = build_parser(QueryArgumentParser, add_help=False)
+    parser.set_defaults(
+        input_crs=args.input_crs,
+        buffer=args.buffer,
+        csvx=args.csvx,
+        csvy=args.csvy,
+        raster_coverage=args.raster_coverage,
+    )
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            qargs = parser.parse_args(shlex.split(line) + ["--shp", str(shp)])
+            query_geom_ll, is_bbox, _ = build_query_geometry(qargs)
+            transformer = get_transformer(qargs.input_crs, pj)
+            query_geom = transform(transformer.transform, query_geom_ll)
+            hits, geoms = find_tiles(query_geom, names, tiles, tree)
+            stats = query_stats(query_geom, geoms, hits, total_tiles, crs_label, is_bbox,
+                                raster=qargs.raster_coverage and HAS_RASTERIO)
+        except Exception as e:
+            print(json.dumps({"error": str(e)}), flush=True)
+            continue
+
+        uniq = sorted(hits)
+        print(
+            json.dumps({"tiles": uniq, "count": len(uniq), **round_stats(stats)}),
+            flush=True,
+        )
+
+
 def main():
     init(autoreset=True)
     args = parse_args()
@@ -266,6 +765,10 @@ def main():
         print(Fore.RED + "Shapefile not found:", shp)
         sys.exit(1)
 
+    if args.serve:
+        serve(args, shp)
+        return
+
     try:
         query_geom_ll, is_bbox, point_list = build_query_geometry(args)
     except Exception as e:
@@ -289,48 +792,33 @@ def main():
         print(f"  Input CRS: {args.input_crs}")
         return
 
-    with fiona.open(str(shp)) as src:
-        total_tiles = len(src)
-        pj = CRS(src.crs)
-        auth = pj.to_authority()
-        crs_label = f"{auth[0]}:{auth[1]} — {pj.name}" if auth else pj.name
+    total_tiles, pj, crs_label, fld = open_index(shp, use_cache=not args.no_cache)
 
-        transformer = Transformer.from_crs(args.input_crs, src.crs, always_xy=True)
-        query_geom = transform(transformer.transform, query_geom_ll)
+    transformer = get_transformer(args.input_crs, pj)
+    query_geom = transform(transformer.transform, query_geom_ll)
+    q_bounds = query_geom.bounds
 
-        fld = next(
-            (f for f in src.schema["properties"] if f.lower().startswith("file")), None
-        )
-        if not fld:
-            print(Fore.RED + "No file-name field in schema")
-            sys.exit(1)
+    if not fld:
+        print(Fore.RED + "No file-name field in schema")
+        sys.exit(1)
+
+    # only tiles whose envelopes overlap the query are decoded and indexed;
+    # the cached bounds already do the coarse filtering an R-tree would
+    names, tiles = load_tiles(shp, fld, pj, bbox=q_bounds, use_cache=not args.no_cache)
 
-        hits, geoms = [], []
-        for feat in src:
-            g = shape(feat["geometry"])
-            if g.intersects(query_geom):
-                hits.append(feat["properties"][fld])
-                geoms.append(g)
+    hits, geoms = find_tiles(query_geom, names, tiles, STRtree(tiles))
 
     if not hits:
         print(Fore.RED + "No tiles found.")
         sys.exit(0)
 
-    # area metrics (feet²)
-    area_ft2 = query_geom.area
-    km2_q = area_ft2 * FT2_TO_M2 / 1e6
-    mi2_q = area_ft2 * FT2_TO_MI2
-
-    union_sel = unary_union(geoms)
-    area2_ft2 = union_sel.area
-    km2_t = area2_ft2 * FT2_TO_M2 / 1e6
-    mi2_t = area2_ft2 * FT2_TO_MI2
-
-    cov = area2_ft2 / area_ft2 * 100 if is_bbox else None
-    over = cov - 100 if is_bbox else None
-
-    used = len(set(hits))
-    pct_used = used / total_tiles * 100
+    if args.raster_coverage and not HAS_RASTERIO:
+        print(Fore.YELLOW + "Warning: rasterio not available, computing exact coverage. Install with:")
+        print("  pip install rasterio")
+    stats = query_stats(query_geom, geoms, hits, total_tiles, crs_label, is_bbox,
+                        raster=args.raster_coverage and HAS_RASTERIO)
+    used = stats["tiles_used"]
+    pct_used = stats["percent_index_used"]
 
     # summary
     rows = [
@@ -341,61 +829,33 @@ def main():
     ]
     if is_bbox:
         rows += [
-            ["BBox km²", f"{km2_q:.2f}"],
-            ["BBox mi²", f"{mi2_q:.2f}"],
-            ["Tiles km²", f"{km2_t:.2f}"],
-            ["Tiles mi²", f"{mi2_t:.2f}"],
-            ["Coverage", f"{cov:.1f}%"],
-            ["Overrun", f"{over:.1f}%"],
+            ["BBox km²", f"{stats['bbox_km2']:.2f}"],
+            ["BBox mi²", f"{stats['bbox_mi2']:.2f}"],
+            ["Tiles km²", f"{stats['tiles_km2']:.2f}"],
+            ["Tiles mi²", f"{stats['tiles_mi2']:.2f}"],
+            ["Coverage", f"{stats['coverage_percent']:.1f}%"],
+            ["Overrun", f"{stats['overrun_percent']:.1f}%"],
         ]
-        if cov < 100:
+        if is_partial_coverage(stats):
             rows.append([Fore.RED + "WARNING", Fore.RED + "Partial coverage!"])
 
     print(Style.BRIGHT + tabulate(rows, tablefmt="plain"))
 
-    # Generate map (unless disabled)
+    # Generate map (unless disabled); it draws every tile, so load them all
     if not args.no_map and HAS_MAPPING:
-        try:
-            gdf_all = gpd.read_file(str(shp))
-            # Use .copy() to avoid SettingWithCopyWarning
-            gdf_sel = gdf_all[gdf_all[fld].isin(set(hits))].copy()
-            gdf_query = gpd.GeoDataFrame(
-                {"geometry": [query_geom]}, crs=pj
-            )
-            gdf_pts = gpd.GeoDataFrame(
-                {"geometry": point_list}, crs=args.input_crs
-            )
-            
-            generate_coverage_map(gdf_all, gdf_sel, gdf_query, gdf_pts)
-            
-        except Exception as e:
-            print(Fore.YELLOW + f"Warning: Map generation failed: {e}")
+        _, all_tiles = load_tiles(shp, fld, pj, use_cache=not args.no_cache)
+        generate_coverage_map(
+            all_tiles, geoms, query_geom, point_list, pj, args.input_crs,
+            output_path=f"coverage_map.{args.map_format}", dpi=args.map_dpi,
+        )
 
     # list and write tiles
-    uniq = sorted(set(hits))
+    uniq = sorted(hits)
     print("\n" + Style.BRIGHT + "Tiles:")
     print(columns(uniq))
 
     # Write output in requested format
-    metadata = {
-        "total_tiles_in_index": total_tiles,
-        "tiles_used": used,
-        "percent_index_used": round(pct_used, 1),
-        "crs": crs_label,
-        "query_type": "bbox" if is_bbox else "csv_points"
-    }
-    
-    if is_bbox:
-        metadata.update({
-            "bbox_km2": round(km2_q, 2),
-            "bbox_mi2": round(mi2_q, 2),
-            "tiles_km2": round(km2_t, 2),
-            "tiles_mi2": round(mi2_t, 2),
-            "coverage_percent": round(cov, 1),
-            "overrun_percent": round(over, 1)
-        })
-
-    write_output(uniq, args.out, args.format, **metadata)
+    write_output(uniq, args.out, args.format, **round_stats(stats))
     
     print(
         Fore.GREEN